@@ -1,31 +1,63 @@
+import atexit
 import datetime
 import logging
 import os
 from datetime import datetime as dt
 from datetime import timedelta
 from logging.config import dictConfig
+from logging.handlers import QueueListener
 
 import psycopg2
-from flask import Flask, jsonify, request
+from flask import Flask, g, jsonify, request
 from psycopg2 import sql
 from psycopg2.extras import RealDictCursor
 from werkzeug.middleware.proxy_fix import ProxyFix
 
-from common import api_settings
+from common import api_settings, database
 from etl import analyzer
 
 from . import config
+from .json_provider import OrjsonProvider
+
+# Timezone of response timestamps
+UTC = datetime.timezone.utc
+
+# Trends report records by (period, hour), the source data only changes when a new scrape lands
+TRENDS_CACHE_SIZE = 32
+trends_cache = {}
+
+# Logging is configured once per process, create_app may run several times in tests
+logging_configured = False
+
+# Latest report query composed once for each report table
+LATEST_REPORT_SQL = {
+    table_name: sql.SQL(
+        """
+        WITH latest AS (
+            SELECT analyzetime FROM {table_name}
+            WHERE analyzetime >= %s AND analyzetime <= %s
+            ORDER BY analyzetime DESC LIMIT 1
+        )
+        SELECT report.* FROM {table_name} AS report
+        JOIN latest ON report.analyzetime = latest.analyzetime
+        ORDER BY report.rate DESC
+        """
+    ).format(table_name=sql.Identifier(table_name))
+    for table_name in api_settings.ALLOWED_REPORTS.values()
+}
 
 
 def create_app(config_object=None):
     """Application factory function."""
     app = Flask(__name__)
+    app.json = OrjsonProvider(app)
 
     # Configure the application
     configure_app(app, config_object)
     configure_logging(app)
 
     # Register components
+    register_request_hooks(app)
     register_error_handlers(app)
     register_basic_routes(app)
     register_report_routes(app)
@@ -38,10 +70,33 @@ def create_app(config_object=None):
 
 def configure_logging(app):
     """Configure logging."""
-    dictConfig(api_settings.API_LOGGING_CONFIG)
+    global logging_configured
+    if not logging_configured:
+        dictConfig(api_settings.API_LOGGING_CONFIG)
+        # The log format does not use thread fields, skip collecting them per record
+        # Process ids stay on, gunicorn's own log format prints them
+        logging.logThreads = False
+        logging.logMultiprocessing = False
+        # A listener thread started in a preloading master leaves its waiter on the queue in every
+        # forked worker, where it swallows the wake-up of the worker's own listener
+        if not api_settings.LOG_LISTENER_ON_FORK:
+            start_log_listener()
+        logging_configured = True
     app.logger = logging.getLogger(__name__)
 
 
+def start_log_listener():
+    """Write queued API log records to the log file from a background thread."""
+    formatter_config = api_settings.BASE_LOGGING_CONFIG["formatters"]["default"]
+    file_handler = logging.FileHandler(api_settings.API_LOG_FILE, mode="a")
+    file_handler.setLevel(logging.INFO)
+    file_handler.setFormatter(logging.Formatter(formatter_config["format"], formatter_config["datefmt"]))
+
+    listener = QueueListener(api_settings.LOG_QUEUE, file_handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+
+
 def configure_app(app, config_object=None):
     """Configure the Flask application."""
     # Load configuration from object if provided
@@ -62,6 +117,15 @@ def configure_app(app, config_object=None):
     )
 
 
+def register_request_hooks(app):
+    """Register request hooks."""
+
+    @app.before_request
+    def set_request_timestamp():
+        # Format the UTC timestamp once, shared by the request log and the response body
+        g.timestamp = dt.now(UTC).isoformat()
+
+
 def register_error_handlers(app):
     """Register error handlers."""
 
@@ -88,21 +152,21 @@ def register_basic_routes(app):
     @app.route("/")
     def index():
         app.logger.info(
-            f"Request received at endpoint: '/', method: '{request.method}', timestamp: '{dt.now(datetime.timezone.utc).isoformat()}'"
+            "Request received at endpoint: '/', method: '%s', timestamp: '%s'", request.method, g.timestamp
         )
         return jsonify({"message": "Welcome!"})
 
     @app.route("/health")
     def health_check():
         app.logger.info(
-            f"Request received at endpoint: '/health', method: '{request.method}', timestamp: '{dt.now(datetime.timezone.utc).isoformat()}'"
+            "Request received at endpoint: '/health', method: '%s', timestamp: '%s'", request.method, g.timestamp
         )
         try:
-            return jsonify({"status": "healthy", "timestamp": dt.now(datetime.timezone.utc).isoformat()}), 200
+            return jsonify({"status": "healthy", "timestamp": g.timestamp}), 200
         except Exception as e:
             return (
                 jsonify(
-                    {"status": "unhealthy", "timestamp": dt.now(datetime.timezone.utc).isoformat(), "error": str(e)}
+                    {"status": "unhealthy", "timestamp": g.timestamp, "error": str(e)}
                 ),
                 500,
             )
@@ -117,7 +181,7 @@ def register_report_routes(app):
         Generate trading volume trends report.
         """
         app.logger.info(
-            f"Request received at endpoint: '/report/trends', method: '{request.method}', timestamp: '{dt.now(datetime.timezone.utc).isoformat()}'"
+            "Request received at endpoint: '/report/trends', method: '%s', timestamp: '%s'", request.method, g.timestamp
         )
         try:
             # Get period parameter from query string, default to 7 if not provided
@@ -129,16 +193,15 @@ def register_report_routes(app):
                         {
                             "status": "error",
                             "message": "Period parameter must be greater than 0",
-                            "timestamp": dt.now(datetime.timezone.utc).isoformat(),
+                            "timestamp": g.timestamp,
                         }
                     ),
                     400,
                 )
 
-            app.logger.info(f"Analyzing trends for the past '{period}' days")
-            trends_df = analyzer.analyzer.trends_analyzer(period=period)
+            trends_data = get_trends_data(period)
 
-            if trends_df.empty:
+            if not trends_data:
                 return (
                     jsonify(
                         {
@@ -146,15 +209,12 @@ def register_report_routes(app):
                             "message": "No trends data available for the specified period",
                             "data": [],
                             "count": 0,
-                            "timestamp": dt.now(datetime.timezone.utc).isoformat(),
+                            "timestamp": g.timestamp,
                         }
                     ),
                     200,
                 )
 
-            # Convert DataFrame to list of dictionaries
-            trends_data = trends_df.to_dict(orient="records")
-
             return (
                 jsonify(
                     {
@@ -162,20 +222,20 @@ def register_report_routes(app):
                         "message": f"Generated trends report for the past '{period}' days",
                         "data": trends_data,
                         "count": len(trends_data),
-                        "timestamp": dt.now(datetime.timezone.utc).isoformat(),
+                        "timestamp": g.timestamp,
                     }
                 ),
                 200,
             )
 
         except Exception as e:
-            app.logger.error(f"Error generating trends report: {e}")
+            app.logger.error("Error generating trends report: %s", e)
             return (
                 jsonify(
                     {
                         "status": "error",
                         "message": "Error generating trends report",
-                        "timestamp": dt.now(datetime.timezone.utc).isoformat(),
+                        "timestamp": g.timestamp,
                     }
                 ),
                 500,
@@ -202,48 +262,43 @@ def register_report_routes(app):
                 ISO format UTC timestamp
         """
         app.logger.info(
-            f"Request received at endpoint: '/report/profit', method: '{request.method}', timestamp: '{dt.now(datetime.timezone.utc).isoformat()}'"
+            "Request received at endpoint: '/report/profit', method: '%s', timestamp: '%s'", request.method, g.timestamp
         )
+        # Reject unknown report types before borrowing a database connection
+        report_type = request.args.get("type", "profit")
+        report_table_name = api_settings.ALLOWED_REPORTS.get(report_type)
+        if report_table_name is None:
+            return (
+                jsonify(
+                    {
+                        "status": "error",
+                        "message": f"Unknown report type '{report_type}'",
+                        "timestamp": g.timestamp,
+                    }
+                ),
+                400,
+            )
+
         try:
-            app.logger.info(f"Attempting to connect to database with config: {api_settings.DATABASE_CONFIG}")
-            with psycopg2.connect(**api_settings.DATABASE_CONFIG) as conn:
+            app.logger.info("Acquiring database connection from pool")
+            with database.get_connection() as conn:
                 try:
                     with conn.cursor(cursor_factory=RealDictCursor) as cur:
-                        report_type = "profit"
-                        report_table_name = api_settings.ALLOWED_REPORTS.get(report_type)
-
                         # Get current hour start time
                         current_datetime = dt.now()
                         current_hour = current_datetime.replace(minute=0, second=0, microsecond=0)
 
-                        # Get the most recent report time with data
+                        # Get the most recent report data in a single round trip
                         max_hours_back = 24
-                        report_time = get_latest_report_time(cur, report_table_name, current_hour, max_hours_back)
-
-                        if not report_time:
-                            return (
-                                jsonify(
-                                    {
-                                        "status": "success",
-                                        "message": f"No data available within '{max_hours_back}' hours",
-                                        "timestamp": dt.now(datetime.timezone.utc).isoformat(),
-                                    }
-                                ),
-                                200,
-                            )
-
-                        # Get the latest report data
-                        results = get_report_data(cur, report_table_name, report_time)
+                        results = get_latest_report_data(cur, report_table_name, current_hour, max_hours_back)
 
                         if not results:
                             return (
                                 jsonify(
                                     {
                                         "status": "success",
-                                        "message": "No results found",
-                                        "data": [],
-                                        "count": 0,
-                                        "timestamp": dt.now(datetime.timezone.utc).isoformat(),
+                                        "message": f"No data available within '{max_hours_back}' hours",
+                                        "timestamp": g.timestamp,
                                     }
                                 ),
                                 200,
@@ -256,88 +311,83 @@ def register_report_routes(app):
                                     "message": "Report retrieved successfully",
                                     "data": results,
                                     "count": len(results),
-                                    "timestamp": dt.now(datetime.timezone.utc).isoformat(),
+                                    "timestamp": g.timestamp,
                                 },
                             ),
                             200,
                         )
 
                 except psycopg2.Error as dbe:
-                    app.logger.error(f"Database operation error: {dbe}")
-                    app.logger.error(f"Connection params: host={api_settings.DATABASE_CONFIG['host']}")
-                    app.logger.error(f"port={api_settings.DATABASE_CONFIG['port']}")
-                    app.logger.error(f"dbname={api_settings.DATABASE_CONFIG['dbname']}")
+                    app.logger.error("Database operation error: %s", dbe)
+                    app.logger.error("Connection params: host=%s", api_settings.DATABASE_CONFIG["host"])
+                    app.logger.error("port=%s", api_settings.DATABASE_CONFIG["port"])
+                    app.logger.error("dbname=%s", api_settings.DATABASE_CONFIG["dbname"])
                     return (
                         jsonify(
                             {
                                 "status": "error",
                                 "message": "Database operation failed",
-                                "timestamp": dt.now(datetime.timezone.utc).isoformat(),
+                                "timestamp": g.timestamp,
                             }
                         ),
                         500,
                     )
 
         except psycopg2.Error as dbe:
-            app.logger.error(f"Database connection error: {dbe}")
+            app.logger.error("Database connection error: %s", dbe)
             return (
                 jsonify(
                     {
                         "status": "error",
                         "message": "Database connection error",
-                        "timestamp": dt.now(datetime.timezone.utc).isoformat(),
+                        "timestamp": g.timestamp,
                     }
                 ),
                 500,
             )
 
-    def get_latest_report_time(cur, table_name: str, start_time: dt, max_hours_back: int = 24) -> dt:
+    def get_trends_data(period: int) -> list:
         """
-        Find the most recent report time that has data.
+        Get trends report records, computed at most once per hour for each period.
 
         Parameters
         ----------
-        cur : psycopg2.extensions.cursor
-            Database cursor
-        table_name : str
-            Name of the table to query
-        start_time : datetime
-            Starting time to search from
-        max_hours_back : int
-            Maximum number of hours to look back
+        period : int
+            The number of days to analyze
 
         Returns
         -------
-        datetime
-            Most recent report time with data
+        list
+            List of trends records
         """
-        app.logger.debug(f"Finding latest report time in table '{table_name}'")
-        start_time = start_time.replace(minute=0, second=0, microsecond=0)
-        end_time = start_time - timedelta(hours=max_hours_back)
-
-        params = []
-        query = sql.SQL(
-            """
-            SELECT DISTINCT analyzetime FROM {table_name}
-            WHERE analyzetime >= %s AND analyzetime <= %s
-            ORDER BY analyzetime DESC LIMIT 1
-            """
-        ).format(table_name=sql.Identifier(table_name))
-        params.extend([end_time, start_time])
-
-        cur.execute(query, params)
-        result = cur.fetchone()
-
-        if result:
-            latest_time = result["analyzetime"]
-        else:
-            latest_time = None
-
-        return latest_time
-
-    def get_report_data(cur, table_name: str, report_time: dt) -> list:
+        current_hour = dt.now().replace(minute=0, second=0, microsecond=0)
+        cache_key = (period, current_hour)
+        trends_data = trends_cache.get(cache_key)
+        if trends_data is not None:
+            app.logger.debug("Using cached trends for the past '%s' days", period)
+            return trends_data
+
+        app.logger.info("Analyzing trends for the past '%s' days", period)
+        trends_df = analyzer.analyzer.trends_analyzer(period=period)
+
+        # Convert DataFrame to list of dictionaries
+        trends_data = trends_df.to_dict(orient="records")
+
+        # Only cache non-empty reports, the current hour may not be scraped yet
+        if trends_data:
+            # Drop reports of previous hours, then bound the cache size
+            for key in list(trends_cache):
+                if key[1] != current_hour:
+                    trends_cache.pop(key, None)
+            if len(trends_cache) >= TRENDS_CACHE_SIZE:
+                trends_cache.clear()
+            trends_cache[cache_key] = trends_data
+
+        return trends_data
+
+    def get_latest_report_data(cur, table_name: str, start_time: dt, max_hours_back: int = 24) -> list:
         """
-        Get report data for a specific time.
+        Get the data of the most recent report that has data.
 
         Parameters
         ----------
@@ -345,23 +395,22 @@ def register_report_routes(app):
             Database cursor
         table_name : str
             Name of the table to query
-        report_time : datetime
-            Time of the report to retrieve
+        start_time : datetime
+            Starting time to search from
+        max_hours_back : int
+            Maximum number of hours to look back
 
         Returns
         -------
         list
-            List of report records
+            List of report records, empty if no report within the time window
         """
-        app.logger.debug(f"Retrieving report data from table '{table_name}' for time '{report_time}'")
-        params = []
-        query = sql.SQL(
-            """
-            SELECT DISTINCT * FROM {table_name}
-            WHERE analyzetime = %s ORDER BY rate DESC
-            """
-        ).format(table_name=sql.Identifier(table_name))
-        params.append(report_time)
+        app.logger.debug("Retrieving latest report data from table '%s'", table_name)
+        start_time = start_time.replace(minute=0, second=0, microsecond=0)
+        end_time = start_time - timedelta(hours=max_hours_back)
+
+        query = LATEST_REPORT_SQL[table_name]
+        params = [end_time, start_time]
 
         cur.execute(query, params)
         result = cur.fetchall()
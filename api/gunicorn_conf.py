@@ -0,0 +1,32 @@
+import os
+
+# Gunicorn server configuration, loaded with `gunicorn -c api/gunicorn_conf.py api.wsgi:app`
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:5000")
+
+# Total database connections the API may hold across all workers, keep it well below
+# Postgres max_connections (100 by default) to leave room for the ETL service
+db_connections = int(os.getenv("API_DB_CONNECTIONS", 16))
+
+# Threaded workers, requests mostly wait on the database so each worker serves several at once.
+# Few workers keep the per-process trends cache shared by more requests
+worker_class = "gthread"
+workers = int(os.getenv("GUNICORN_WORKERS", 2))
+
+# Split the connection budget over the workers, one pooled connection per thread
+threads = int(os.getenv("GUNICORN_THREADS", max(1, db_connections // workers)))
+os.environ["DB_POOL_MAX"] = os.environ["DB_POOL_MIN"] = str(threads)
+
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 60))
+keepalive = 5
+
+# Import the application once in the master so workers share its modules copy-on-write
+preload_app = True
+# The preloaded app must not start its log listener in the master, workers start one in post_fork
+os.environ["API_LOG_LISTENER_ON_FORK"] = "1"
+
+
+def post_fork(server, worker):
+    """Start the log file listener in each worker, the master does not run one."""
+    from api.app import start_log_listener
+
+    start_log_listener()
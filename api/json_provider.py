@@ -0,0 +1,54 @@
+import orjson
+from flask.json.provider import DefaultJSONProvider
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    Flask JSON provider backed by orjson.
+
+    Dates and other types orjson cannot encode natively are passed to the
+    default Flask serializer, so responses keep the same format as ``jsonify``.
+    """
+
+    option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+    def dumps(self, obj, **kwargs) -> str:
+        """
+        Serialize data as JSON.
+
+        Parameters
+        ----------
+        obj : Any
+            The data to serialize
+        **kwargs
+            ``sort_keys`` and ``indent`` are honoured, other ``json.dumps`` arguments are ignored
+
+        Returns
+        -------
+        str
+            JSON encoded string
+        """
+        option = self.option
+        if kwargs.get("sort_keys", self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        if kwargs.get("indent"):
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=kwargs.get("default", self.default), option=option).decode()
+
+    def loads(self, s, **kwargs):
+        """
+        Deserialize data as JSON.
+
+        Parameters
+        ----------
+        s : str or bytes
+            Text or UTF-8 bytes
+        **kwargs
+            Ignored, kept for compatibility with ``json.loads``
+
+        Returns
+        -------
+        Any
+            Decoded data
+        """
+        return orjson.loads(s)
@@ -1,19 +1,25 @@
 import os
+import queue
+from types import MappingProxyType
 
 from .base_settings import *
 
-# API logging configuration
-API_LOGGING_CONFIG = BASE_LOGGING_CONFIG.copy()
-API_LOGGING_CONFIG.update(
+# API log file, written by a background listener fed through LOG_QUEUE
+API_LOG_FILE = os.path.join(LOG_DIR, "api.log")
+LOG_QUEUE = queue.Queue()
+# Set by the gunicorn config, each worker then starts its own listener after the fork instead of the master
+LOG_LISTENER_ON_FORK = os.getenv("API_LOG_LISTENER_ON_FORK") == "1"
+
+# API logging configuration, read-only so importers cannot change the shared settings
+API_LOGGING_CONFIG = MappingProxyType(
     {
+        **BASE_LOGGING_CONFIG,
         "handlers": {
             **BASE_LOGGING_CONFIG["handlers"],
             "file": {
-                "class": "logging.FileHandler",
+                "class": "logging.handlers.QueueHandler",
                 "level": "INFO",
-                "formatter": "default",
-                "filename": os.path.join(LOG_DIR, "api.log"),
-                "mode": "a",
+                "queue": "ext://common.api_settings.LOG_QUEUE",
             },
             "wsgi": {
                 "class": "logging.StreamHandler",
@@ -17,6 +17,12 @@ DATABASE_CONFIG = {
     "port": os.getenv("DB_PORT"),
 }
 
+# Database connection pool size per process
+DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", 8))
+# psycopg2 closes returned connections once the pool holds DB_POOL_MIN idle ones,
+# keep as many as can be borrowed at once so concurrent borrows do not reconnect
+DB_POOL_MIN = int(os.getenv("DB_POOL_MIN", DB_POOL_MAX))
+
 # Logging configuration
 LOG_DIR = "/app/logs"
 os.makedirs(LOG_DIR, exist_ok=True)
@@ -0,0 +1,99 @@
+import atexit
+import csv
+import io
+import threading
+from contextlib import contextmanager
+from typing import Iterable, Iterator, Sequence
+
+from psycopg2 import sql
+from psycopg2.extensions import connection, cursor
+from psycopg2.pool import ThreadedConnectionPool
+
+from .base_settings import DATABASE_CONFIG, DB_POOL_MAX, DB_POOL_MIN
+
+# NULL marker for COPY, so empty strings are not loaded as NULL
+COPY_NULL = "\\N"
+
+# Connection pool of the current process, created on first use so forked workers do not share sockets
+connection_pool = None
+pool_lock = threading.Lock()
+
+
+def get_pool() -> ThreadedConnectionPool:
+    """Return the process wide connection pool, creating it if needed"""
+    global connection_pool
+    if connection_pool is None:
+        with pool_lock:
+            if connection_pool is None:
+                connection_pool = ThreadedConnectionPool(DB_POOL_MIN, DB_POOL_MAX, **DATABASE_CONFIG)
+                atexit.register(close_pool)
+    return connection_pool
+
+
+def close_pool() -> None:
+    """Close all pooled connections"""
+    global connection_pool
+    with pool_lock:
+        if connection_pool is not None:
+            connection_pool.closeall()
+            connection_pool = None
+
+
+@contextmanager
+def get_connection() -> Iterator[connection]:
+    """
+    Borrow a connection from the pool.
+
+    The transaction is committed when the block exits normally and rolled back on error,
+    the same as using ``psycopg2.connect()`` as a context manager.
+
+    Yields
+    ------
+    psycopg2.extensions.connection
+        Pooled database connection
+
+    Raises
+    ------
+    psycopg2.Error
+        If the pool cannot connect or is exhausted
+    """
+    pool = get_pool()
+    conn = pool.getconn()
+    try:
+        with conn:
+            yield conn
+    finally:
+        # Drop broken connections instead of handing them out again
+        pool.putconn(conn, close=bool(conn.closed))
+
+
+def copy_records(cur: cursor, table_name: str, columns: Sequence[str], records: Iterable[Sequence]) -> None:
+    """
+    Bulk load records into a table with COPY.
+
+    Parameters
+    ----------
+    cur : psycopg2.extensions.cursor
+        Database cursor
+    table_name : str
+        Name of the target table
+    columns : sequence of str
+        Target columns, in the same order as the record values
+    records : iterable of sequence
+        Rows to load, None values are loaded as NULL
+
+    Raises
+    ------
+    psycopg2.Error
+        If the COPY fails
+    """
+    copy_query = sql.SQL("COPY {table_name} ({fields}) FROM STDIN WITH (FORMAT csv, NULL {null})").format(
+        table_name=sql.Identifier(table_name),
+        fields=sql.SQL(", ").join(map(sql.Identifier, columns)),
+        null=sql.Literal(COPY_NULL),
+    )
+
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows([COPY_NULL if value is None else value for value in record] for record in records)
+    buffer.seek(0)
+    cur.copy_expert(copy_query, buffer)
@@ -1,4 +1,5 @@
 import os
+from types import MappingProxyType
 
 from .base_settings import *
 
@@ -36,10 +37,15 @@ REPORT_DATA_SOURCE = {
     "trend": "scraped_marketsublist",
 }
 
-# Logging configuration
-ETL_LOGGING_CONFIG = BASE_LOGGING_CONFIG.copy()
-ETL_LOGGING_CONFIG.update(
+# Data source columns the analyzer may select
+ALLOWED_FIELDS = frozenset(
+    {"scrapetime", "category", "name", "id", "sid", "currentstock", "lastsoldprice", "totaltrades"}
+)
+
+# Logging configuration, read-only so importers cannot change the shared settings
+ETL_LOGGING_CONFIG = MappingProxyType(
     {
+        **BASE_LOGGING_CONFIG,
         "handlers": {
             **BASE_LOGGING_CONFIG["handlers"],
             "file": {
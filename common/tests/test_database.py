@@ -0,0 +1,62 @@
+import csv
+import io
+import sys
+from pathlib import Path
+
+# Add the repository root to the Python path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent))
+import unittest
+
+from common import database
+
+
+class FakeCursor:
+    """Cursor stand-in that captures the COPY buffer"""
+
+    def __init__(self):
+        self.query = None
+        self.buffer = None
+
+    def copy_expert(self, query, file):
+        self.query = query
+        self.buffer = file.read()
+
+
+class TestCopyRecords(unittest.TestCase):
+    def copy(self, records):
+        cur = FakeCursor()
+        database.copy_records(cur, "test_table", ("name", "rate"), records)
+        return cur
+
+    def test_copy_records(self):
+        test_cases = [
+            # None is written as the NULL marker
+            ((None, 1), f"{database.COPY_NULL},1\r\n"),
+            # Empty string is written as an empty field, only the marker is read as NULL
+            (("", 1), ",1\r\n"),
+            # Quotes, commas and newlines in item names are quoted
+            (('a "b"', 1), '"a ""b""",1\r\n'),
+            (("a,b", 1), '"a,b",1\r\n'),
+            (("a\nb", 1), '"a\nb",1\r\n'),
+            # Non-finite rates keep a form Postgres parses
+            (("item", float("nan")), "item,nan\r\n"),
+            (("item", float("inf")), "item,inf\r\n"),
+            (("item", float("-inf")), "item,-inf\r\n"),
+        ]
+
+        for record, expected in test_cases:
+            with self.subTest(msg=f"Testing COPY encoding for: {record}"):
+                cur = self.copy([record])
+                self.assertEqual(cur.buffer, expected)
+
+    def test_copy_records_round_trip(self):
+        records = [(None, 1), ("", 2), ('a "b", c\nd', 3)]
+        cur = self.copy(records)
+
+        # Reading the buffer back as CSV gives the original values, with NULL marked
+        rows = list(csv.reader(io.StringIO(cur.buffer)))
+        self.assertEqual(rows, [[database.COPY_NULL, "1"], ["", "2"], ['a "b", c\nd', "3"]])
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
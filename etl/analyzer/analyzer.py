@@ -1,17 +1,37 @@
 import datetime
 import logging
 from datetime import datetime as dt
-from typing import Dict, Optional
+from typing import Dict, Optional, Sequence, Tuple
 
+import numpy as np
 import pandas as pd
 import psycopg2
 from psycopg2 import sql
-from psycopg2.extras import execute_batch
 
-from common import etl_settings
+from common import database, etl_settings
 
 logger = logging.getLogger("analyzer")
 
+# After tax rate applied to the selling price
+NORMAL_TAX_RATE = 0.88725
+MERCHANT_TAX_RATE = 0.85475
+
+# Item category covered by the profit report
+PROFIT_CATEGORY = "accessory"
+
+# Columns selected by fetch_data by default, and the subset the profit report reads
+FETCH_COLUMNS = ("scrapetime", "category", "name", "id", "sid", "currentstock", "lastsoldprice", "totaltrades")
+PROFIT_COLUMNS = ("category", "name", "id", "sid", "currentstock", "lastsoldprice")
+
+# Integer columns downcast after fetch, their values are far smaller than int64
+DOWNCAST_COLUMNS = frozenset({"sid", "currentstock", "totaltrades"})
+
+# String columns converted to categorical after fetch
+CATEGORICAL_COLUMNS = frozenset({"category", "name"})
+
+# Composed fetch_data queries by table name, columns and filter clauses
+QUERY_CACHE: Dict[Tuple[str, ...], str] = {}
+
 
 class AnalyzerError(Exception):
     pass
@@ -31,7 +51,7 @@ def get_table_name(report_type: str) -> str:
     table_name = etl_settings.REPORT_DATA_SOURCE.get(report_type, None)
     if table_name is None:
         raise ValueError(f"Invalid endpoint key: '{report_type}'")
-    logger.debug(f"{table_name=}")
+    logger.debug("table_name=%r", table_name)
     return table_name
 
 
@@ -41,7 +61,7 @@ def get_report_table_name(report_type: str) -> str:
     report_table_name = etl_settings.REPORT_TABLES.get(report_type, None)
     if report_table_name is None:
         raise ValueError(f"Invalid endpoint key: '{report_type}'")
-    logger.debug(f"{report_table_name=}")
+    logger.debug("report_table_name=%r", report_table_name)
     return report_table_name
 
 
@@ -50,6 +70,8 @@ def fetch_data(
     name: Optional[str] = None,
     sid: Optional[int] = None,
     datetime_filter: Optional[dt] = None,
+    category: Optional[str] = None,
+    columns: Sequence[str] = FETCH_COLUMNS,
 ) -> pd.DataFrame:
     """
     Fetch data from the database based on given parameters.
@@ -64,6 +86,10 @@ def fetch_data(
         Enhancement level to filter results
     datetime_filter : datetime, optional
         Datetime to filter results. Will fetch data for the specified hour
+    category : str, optional
+        Item category to filter results
+    columns : sequence of str, optional
+        Columns to select, must be in ``etl_settings.ALLOWED_FIELDS`` (default all data source columns)
 
     Returns
     -------
@@ -78,67 +104,174 @@ def fetch_data(
         If database operation fails
     """
     logger.info(f"Fetching data from '{table_name}'")
-    logger.debug(f"{table_name=}, {name=}, {sid=}, {datetime_filter=}")
+    logger.debug(
+        "table_name=%r, name=%r, sid=%r, datetime_filter=%r, category=%r, columns=%r",
+        table_name,
+        name,
+        sid,
+        datetime_filter,
+        category,
+        columns,
+    )
     try:
-        with psycopg2.connect(**etl_settings.DATABASE_CONFIG) as conn:
+        with database.get_connection() as conn:
             # Validate input to prevent dynamic injection
             if table_name not in etl_settings.REPORT_DATA_SOURCE.values():
                 raise ValueError("Invalid table name provided")
+            columns = tuple(columns)
+            if not etl_settings.ALLOWED_FIELDS.issuperset(columns):
+                raise ValueError("Invalid column name provided")
 
-            # Initialize parameters list
+            # Initialize filter clauses and parameters list
+            conditions = []
             params = []
 
-            # Base query
-            query = sql.SQL("SELECT {fields} FROM {table_name} WHERE 1=1").format(
-                fields=sql.SQL(",").join(
-                    [
-                        sql.Identifier("scrapetime"),
-                        sql.Identifier("category"),
-                        sql.Identifier("name"),
-                        sql.Identifier("id"),
-                        sql.Identifier("sid"),
-                        sql.Identifier("currentstock"),
-                        sql.Identifier("lastsoldprice"),
-                        sql.Identifier("totaltrades"),
-                    ]
-                ),
-                table_name=sql.Identifier(table_name),
-            )
-
             # Search by name
             if name:
-                query = sql.SQL(" ").join([query, sql.SQL("AND name ILIKE %s")])
+                conditions.append("AND name ILIKE %s")
                 params.append(f"%{name}%")
 
             # Search by sid (enhancement level)
             if sid:
-                query = sql.SQL(" ").join([query, sql.SQL("AND sid = %s")])
+                conditions.append("AND sid = %s")
                 params.append(sid)
 
+            # Search by category
+            if category:
+                conditions.append("AND category = %s")
+                params.append(category)
+
             # Date handling
             # Case 1: No datetime filter provided, get the latest data
             if not datetime_filter:
                 current_datetime = dt.now()
                 start_time = current_datetime.replace(minute=0, second=0, microsecond=0)
-                query = sql.SQL(" ").join([query, sql.SQL("AND scrapetime >= %s")])
+                conditions.append("AND scrapetime >= %s")
                 params.append(start_time)
 
             # Case 2: datetime filter provided, get data for the specific hour
             else:
                 start_time = datetime_filter.replace(minute=0, second=0, microsecond=0)
                 end_time = datetime_filter.replace(minute=59, second=59, microsecond=999999)
-                query = sql.SQL(" ").join([query, sql.SQL("AND scrapetime >= %s AND scrapetime < %s")])
+                conditions.append("AND scrapetime >= %s AND scrapetime < %s")
                 params.extend([start_time, end_time])
 
+            # The query text only depends on the table, columns and which filters are used, compose it once
+            query_key = (table_name, columns, *conditions)
+            query_string = QUERY_CACHE.get(query_key)
+            if query_string is None:
+                # Base query
+                query = sql.SQL("SELECT {fields} FROM {table_name} WHERE 1=1").format(
+                    fields=sql.SQL(",").join(map(sql.Identifier, columns)),
+                    table_name=sql.Identifier(table_name),
+                )
+                query = sql.SQL(" ").join([query, *map(sql.SQL, conditions)])
+                query_string = query.as_string(conn)
+                QUERY_CACHE[query_key] = query_string
+
             # Execute query
-            logger.debug(f"pd.read_sql_query({query.as_string(conn)}, {params=})")
-            df = pd.read_sql_query(query.as_string(conn), conn, params=params)
+            logger.debug("cur.execute(%s, params=%r)", query_string, params)
+            with conn.cursor() as cur:
+                cur.execute(query_string, params)
+                columns = [column.name for column in cur.description]
+                df = pd.DataFrame(cur.fetchall(), columns=columns)
 
             if df.empty:
                 logger.warning("Query returned no results")
 
+            # Repeated strings as categorical codes, comparisons and dedup work on integers
+            for column in CATEGORICAL_COLUMNS.intersection(columns):
+                df[column] = df[column].astype("category")
+
+            # Narrow small integer columns to the smallest fitting width, prices stay int64
+            if not df.empty:
+                for column in DOWNCAST_COLUMNS.intersection(columns):
+                    df[column] = pd.to_numeric(df[column], downcast="integer")
+
             logger.info(f"Successfully fetched data from '{table_name}'")
-            logger.debug(f"{df.shape=}")
+            logger.debug("df.shape=%r", df.shape)
+            return df
+
+    except psycopg2.Error as dbe:
+        logger.error(f"Database operation error: {dbe}")
+        raise DatabaseError(f"Database operation failed: {dbe}")
+
+
+def fetch_trends_data(table_name: str, current_datetime: dt, past_datetime: dt) -> pd.DataFrame:
+    """
+    Fetch the trading volume change of each item between two snapshots.
+
+    Parameters
+    ----------
+    table_name : str
+        Name of the database table to query
+    current_datetime : datetime
+        Datetime of the current snapshot. Will fetch data for the specified hour
+    past_datetime : datetime
+        Datetime of the past snapshot. Will fetch data for the specified hour
+
+    Returns
+    -------
+    pandas.DataFrame
+        DataFrame with the current price, stock and volume change of each item
+
+    Raises
+    ------
+    ValueError
+        If invalid table name is provided
+    DatabaseError
+        If database operation fails
+
+    Notes
+    -----
+    The two snapshots are joined and subtracted in the database, only the matched rows are transferred.
+    """
+    logger.info(f"Fetching trends data from '{table_name}'")
+    logger.debug(
+        "table_name=%r, current_datetime=%r, past_datetime=%r", table_name, current_datetime, past_datetime
+    )
+    try:
+        with database.get_connection() as conn:
+            # Validate input to prevent dynamic injection
+            if table_name not in etl_settings.REPORT_DATA_SOURCE.values():
+                raise ValueError("Invalid table name provided")
+
+            query = sql.SQL(
+                """
+                SELECT
+                    cur.category, cur.name, cur.sid AS enhance,
+                    cur.lastsoldprice AS price, cur.currentstock AS stock,
+                    cur.totaltrades - past.totaltrades AS volumechange
+                FROM {table_name} AS cur
+                JOIN {table_name} AS past
+                    ON cur.id = past.id AND cur.sid = past.sid AND cur.name = past.name
+                    AND cur.category IS NOT DISTINCT FROM past.category
+                WHERE cur.scrapetime >= %s AND cur.scrapetime < %s
+                    AND past.scrapetime >= %s AND past.scrapetime < %s
+                """
+            ).format(table_name=sql.Identifier(table_name))
+
+            # Each snapshot covers the hour of its datetime
+            params = []
+            for datetime_filter in (current_datetime, past_datetime):
+                start_time = datetime_filter.replace(minute=0, second=0, microsecond=0)
+                end_time = datetime_filter.replace(minute=59, second=59, microsecond=999999)
+                params.extend([start_time, end_time])
+
+            # Execute query
+            # Rendering the query takes a round of escaping, only do it when debug logging is on
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("cur.execute(%s, params=%r)", query.as_string(conn), params)
+            with conn.cursor() as cur:
+                cur.execute(query, params)
+                columns = [column.name for column in cur.description]
+                df = pd.DataFrame(cur.fetchall(), columns=columns)
+
+            if df.empty:
+                logger.warning("Query returned no results")
+
+            logger.info(f"Successfully fetched trends data from '{table_name}'")
+            logger.debug("df.shape=%r", df.shape)
             return df
 
     except psycopg2.Error as dbe:
@@ -146,6 +279,44 @@ def fetch_data(
         raise DatabaseError(f"Database operation failed: {dbe}")
 
 
+def calculate_returns(
+    current_lv_price: np.ndarray,
+    previous_lv_price: np.ndarray,
+    clean_price: np.ndarray,
+    merchant: bool = False,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Calculate profit and rate of return from enhancement level prices.
+
+    Parameters
+    ----------
+    current_lv_price : numpy.ndarray
+        lastSoldPrice of the enhancement levels to analyze
+    previous_lv_price : numpy.ndarray
+        lastSoldPrice of the previous enhancement levels
+    clean_price : numpy.ndarray
+        lastSoldPrice of the 0 enhancement levels
+    merchant : bool, optional
+        Whether to use merchant tax rate (default False)
+
+    Returns
+    -------
+    tuple of numpy.ndarray
+        Profit and rate of return, element-wise for the given prices
+    """
+    after_tax = NORMAL_TAX_RATE
+    if merchant:
+        after_tax = MERCHANT_TAX_RATE
+
+    # Reuse the intermediate arrays in place instead of allocating one per operation
+    cost = np.add(previous_lv_price, clean_price, dtype=np.float64)
+    profit = np.subtract(current_lv_price, cost, dtype=np.float64)
+    profit *= after_tax
+    rate_of_return = profit / cost
+    rate_of_return += 1
+    return profit, rate_of_return
+
+
 def calculate_stats(df: pd.DataFrame, sid: int, merchant: bool = False) -> Dict:
     """
     Calculate profit and rate of return by comparing enhancement levels.
@@ -173,38 +344,28 @@ def calculate_stats(df: pd.DataFrame, sid: int, merchant: bool = False) -> Dict:
     AnalyzerError
         If calculation fails due to missing data
     """
-    logger.debug(f"calculate_stats({df.shape=}, {sid=}, {merchant=})")
-    NORMAL_TAX_RATE = 0.88725
-    MERCHANT_TAX_RATE = 0.85475
-
+    logger.debug("calculate_stats(df.shape=%r, sid=%r, merchant=%r)", df.shape, sid, merchant)
     # If sid is 0, there is no previous enhancement level and no need to compare
     if sid == 0:
         stat = {"profit": 0, "rate": 0}
         return stat
 
-    after_tax = NORMAL_TAX_RATE
-    if merchant:
-        after_tax = MERCHANT_TAX_RATE
-
     try:
+        # lastSoldPrice by enhance level, keep the first record of each level
+        price_by_sid = df.drop_duplicates(subset="sid").set_index("sid")["lastsoldprice"].to_dict()
         # Current enhance level lastSoldPrice
-        current_lv_price = df[df["sid"] == sid]["lastsoldprice"].iloc[0]
+        current_lv_price = price_by_sid[sid]
         # Previous enhance level lastSoldPrice
-        previous_lv_price = df[df["sid"] == (sid - 1)]["lastsoldprice"].iloc[0]
+        previous_lv_price = price_by_sid[sid - 1]
         # 0 enhance level lastSoldPrice
-        clean_price = df[df["sid"] == 0]["lastsoldprice"].iloc[0]
+        clean_price = price_by_sid[0]
 
         # Calculate stats
-        cost = previous_lv_price + clean_price
-        profit = (current_lv_price - cost) * after_tax
-        rate_of_return = 1 + (profit / cost)
+        profit, rate_of_return = calculate_returns(current_lv_price, previous_lv_price, clean_price, merchant)
 
         stat = {"profit": profit, "rate": rate_of_return}
         return stat
 
-    except IndexError as ie:
-        logger.error(f"IndexError: {ie}")
-        raise AnalyzerError(f"IndexError: {ie}")
     except KeyError as ke:
         logger.error(f"KeyError: {ke}")
         raise AnalyzerError(f"KeyError: {ke}")
@@ -231,43 +392,57 @@ def profit_analyzer(df: pd.DataFrame) -> pd.DataFrame:
     current_time = dt.now()
     analyze_time = current_time.replace(minute=0, second=0, microsecond=0)
 
-    records = []
     try:
         # Filter for specific conditions
-        df = df[df["category"] == "accessory"]
+        df = df[df["category"] == PROFIT_CATEGORY]
         if df.empty:
-            logger.warning("No accessory data to analyze")
+            logger.warning(f"No {PROFIT_CATEGORY} data to analyze")
             return pd.DataFrame()
 
-        # Group by item id to ensure processing the same item
-        for item_id in df["id"].unique():
-            # Create item dataframe
-            item_df = df[df["id"] == item_id].copy()
-            item_df = item_df.sort_values(by="sid")
-
-            # Process each enhancement level
-            for _, row in item_df.iterrows():
-                stats = calculate_stats(item_df, row["sid"])
-                records.append(
-                    {
-                        "analyzetime": analyze_time,
-                        "category": row["category"],
-                        "name": row["name"],
-                        "enhance": row["sid"],
-                        "price": row["lastsoldprice"],
-                        "profit": stats["profit"],
-                        "rate": stats["rate"],
-                        "stock": row["currentstock"],
-                    }
-                )
+        # Order by item id then enhancement level, same as processing item by item
+        df = df.sort_values(by=["id", "sid"], kind="mergesort")
+
+        # Price lookup by (id, sid), keep the first record like a row-wise lookup would
+        price_by_level = df.drop_duplicates(subset=["id", "sid"]).set_index(["id", "sid"])["lastsoldprice"]
+        previous_lv_index = pd.MultiIndex.from_arrays([df["id"], df["sid"] - 1])
+        clean_index = pd.MultiIndex.from_arrays([df["id"], np.zeros(len(df), dtype=np.int64)])
 
-        analyzed_df = pd.DataFrame.from_records(records)
-        logger.debug(f"{analyzed_df.shape=}")
-        return analyzed_df.sort_values(by="rate", ascending=False)
+        # Previous enhance level and 0 enhance level lastSoldPrice for every row at once
+        current_lv_price = df["lastsoldprice"].to_numpy(dtype=np.float64)
+        previous_lv_price = price_by_level.reindex(previous_lv_index).to_numpy(dtype=np.float64)
+        clean_price = price_by_level.reindex(clean_index).to_numpy(dtype=np.float64)
+
+        # If sid is 0, there is no previous enhancement level and no need to compare
+        base_level = (df["sid"] == 0).to_numpy()
+        missing = ~base_level & (np.isnan(previous_lv_price) | np.isnan(clean_price))
+        if missing.any():
+            missing_ids = df.loc[missing, "id"].unique().tolist()
+            raise AnalyzerError(f"Missing enhancement level price for item id: {missing_ids}")
+
+        # Calculate stats
+        profit, rate_of_return = calculate_returns(current_lv_price, previous_lv_price, clean_price)
+        profit = np.where(base_level, 0, profit)
+        rate_of_return = np.where(base_level, 0, rate_of_return)
+
+        # Assemble from plain arrays, skips aligning every column on the filtered index
+        analyzed_df = pd.DataFrame(
+            {
+                "analyzetime": analyze_time,
+                "category": df["category"].to_numpy(),
+                "name": df["name"].to_numpy(),
+                "enhance": df["sid"].to_numpy(),
+                "price": df["lastsoldprice"].to_numpy(),
+                "profit": profit,
+                "rate": rate_of_return,
+                "stock": df["currentstock"].to_numpy(),
+            }
+        )
+        logger.debug("analyzed_df.shape=%r", analyzed_df.shape)
+
+        # Sort by rate of return descending, argsort on the raw array skips the pandas sort machinery
+        order = np.argsort(-rate_of_return, kind="stable")
+        return analyzed_df.take(order)
 
-    except IndexError as ie:
-        logger.error(f"IndexError: {ie}")
-        raise AnalyzerError(f"IndexError: {ie}")
     except KeyError as ke:
         logger.error(f"KeyError: {ke}")
         raise AnalyzerError(f"KeyError: {ke}")
@@ -301,7 +476,7 @@ def store_data(analyzed_df: pd.DataFrame, table_name: str) -> None:
         raise ValidationError("No table name to store")
 
     try:
-        with psycopg2.connect(**etl_settings.DATABASE_CONFIG) as conn:
+        with database.get_connection() as conn:
             logger.debug("Database connection established")
             with conn.cursor() as cur:
                 try:
@@ -324,30 +499,39 @@ def store_data(analyzed_df: pd.DataFrame, table_name: str) -> None:
                     ).format(table_name=sql.Identifier(table_name))
                     cur.execute(create_table_query)
 
-                    # Batch insert
-                    # Prepare for batch insert
+                    # Bulk load into a staging table, then merge to skip existing records
+                    columns = ["analyzetime", "category", "name", "enhance", "price", "profit", "rate", "stock"]
+                    fields = sql.SQL(", ").join(map(sql.Identifier, columns))
+                    staging_table_name = f"{table_name}_staging"
+                    staging_query = sql.SQL(
+                        """
+                        CREATE TEMP TABLE {staging_table_name} ON COMMIT DROP AS
+                        SELECT {fields} FROM {table_name} WITH NO DATA;
+                        ALTER TABLE {staging_table_name} ALTER COLUMN profit TYPE NUMERIC;
+                        """
+                    ).format(
+                        staging_table_name=sql.Identifier(staging_table_name),
+                        fields=fields,
+                        table_name=sql.Identifier(table_name),
+                    )
+                    cur.execute(staging_query)
+
+                    # Profit is staged as NUMERIC, so it is rounded to BIGINT on merge the same as a direct insert
+                    records = analyzed_df[columns].itertuples(index=False, name=None)
+                    database.copy_records(cur, staging_table_name, columns, records)
+
                     insert_query = sql.SQL(
                         """
-                        INSERT INTO {table_name} (analyzeTime, category, name, enhance, price, profit, rate, stock)
-                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+                        INSERT INTO {table_name} ({fields})
+                        SELECT {fields} FROM {staging_table_name}
                         ON CONFLICT (analyzetime, name, enhance) DO NOTHING;
                         """
-                    ).format(table_name=sql.Identifier(table_name))
-                    records = []
-                    for item in analyzed_df.to_dict(orient="records"):
-                        record = (
-                            item["analyzetime"],
-                            item["category"],
-                            item["name"],
-                            item["enhance"],
-                            item["price"],
-                            item["profit"],
-                            item["rate"],
-                            item["stock"],
-                        )
-                        records.append(record)
-
-                    execute_batch(cur, insert_query, records)
+                    ).format(
+                        table_name=sql.Identifier(table_name),
+                        fields=fields,
+                        staging_table_name=sql.Identifier(staging_table_name),
+                    )
+                    cur.execute(insert_query)
                     conn.commit()
                     logger.info(f"Successfully stored '{len(analyzed_df)}' records in '{table_name}'")
 
@@ -361,10 +545,11 @@ def store_data(analyzed_df: pd.DataFrame, table_name: str) -> None:
 
 
 def analyzer(report_type: str) -> None:
-    logger.debug(f"analyzer({report_type=})")
+    logger.debug("analyzer(report_type=%r)", report_type)
     try:
         table_name = get_table_name(report_type)
-        df = fetch_data(table_name)
+        # Only the profit category is analyzed, filter it in the database
+        df = fetch_data(table_name, category=PROFIT_CATEGORY, columns=PROFIT_COLUMNS)
         analyzed_df = profit_analyzer(df)
         report_table_name = get_report_table_name(report_type)
         store_data(analyzed_df, report_table_name)
@@ -402,56 +587,27 @@ def trends_analyzer(period: int):
     analyze_datetime = current_datetime.replace(minute=0, second=0, microsecond=0)
     # Calculate the past date and time based on the number of days
     past_datetime = current_datetime - datetime.timedelta(days=period)
-    logger.debug(f"{past_datetime=}")
+    logger.debug("past_datetime=%r", past_datetime)
 
-    # Fetch data for the current and past dates
-    current_df = fetch_data(table_name=table_name, datetime_filter=current_datetime)
-    past_df = fetch_data(table_name=table_name, datetime_filter=past_datetime)
-    if current_df.empty or past_df.empty:
+    # Fetch the volume change between the current and past snapshots
+    trend_df = fetch_trends_data(table_name, current_datetime, past_datetime)
+    if trend_df.empty:
         logger.warning("Dataframe is empty")
         return pd.DataFrame()
 
     # Prevent divide by zero error, convert time difference to fraction of a day
     time_difference_seconds = (current_datetime - past_datetime).total_seconds()
-    print(f"{time_difference_seconds=}")
-    time_difference_days = time_difference_seconds / 86400
-
-    # Merge current and past dataframes
-    merge_df = current_df.merge(
-        past_df,
-        on=["category", "name", "id", "sid"],
-        how="inner",
-        suffixes=("_current", "_past"),
-    )
-    logger.debug(f"{merge_df.shape=}")
+    logger.debug("time_difference_seconds=%r", time_difference_seconds)
+    elapsed_days = time_difference_seconds / 86400
 
-    # Calculate volume change
-    merge_df["volumechange"] = merge_df["totaltrades_current"] - merge_df["totaltrades_past"]
-
-    # Calculate average trades per day
+    # Less than 1 day, scale by the hours remaining until the end of trading
     trading_end_time = current_datetime.replace(hour=23, minute=0, second=0, microsecond=0)
-    if time_difference_seconds < 86400:
-        remaining_seconds = (trading_end_time - current_datetime).total_seconds()
-        remaining_hours = remaining_seconds / 3600
-        if remaining_hours > 0:
-            # Scale by remaining hours
-            merge_df["averagetradesperday"] = merge_df["volumechange"] * (24 / remaining_hours)
-    # More than 1 day
-    else:
-        merge_df["averagetradesperday"] = merge_df["volumechange"] / time_difference_days
-
-    # Create result dataframe
-    trend_df = pd.DataFrame(
-        {
-            "analyzetime": analyze_datetime,
-            "category": merge_df["category"],
-            "name": merge_df["name"],
-            "enhance": merge_df["sid"],
-            "price": merge_df["lastsoldprice_current"],
-            "stock": merge_df["currentstock_current"],
-            "volumechange": merge_df["volumechange"],
-            "averagetradesperday": merge_df["averagetradesperday"],
-        }
-    )
-    logger.debug(f"{trend_df.shape=}")
+    remaining_hours = (trading_end_time - current_datetime).total_seconds() / 3600
+    if time_difference_seconds < 86400 and remaining_hours > 0:
+        elapsed_days = remaining_hours / 24
+
+    # Calculate average trades per day for every item at once
+    trend_df["averagetradesperday"] = trend_df["volumechange"].to_numpy() / elapsed_days
+    trend_df.insert(0, "analyzetime", analyze_datetime)
+    logger.debug("trend_df.shape=%r", trend_df.shape)
     return trend_df.sort_values(by="averagetradesperday", ascending=False)
@@ -7,6 +7,7 @@ sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 import unittest
 
 import analyzer
+import numpy as np
 import pandas as pd
 
 
@@ -61,6 +62,47 @@ class TestAnalyzer(unittest.TestCase):
         self.assertEqual(base_stats["profit"], 0)
         self.assertEqual(base_stats["rate"], 0)
 
+    def test_calculate_returns(self):
+        current_lv_price = np.array([200.0, 500.0])
+        previous_lv_price = np.array([100.0, 200.0])
+        clean_price = np.array([100.0, 100.0])
+
+        # Normal tax rate
+        profit, rate = analyzer.calculate_returns(current_lv_price, previous_lv_price, clean_price)
+        np.testing.assert_allclose(profit, [0.0, 200 * analyzer.NORMAL_TAX_RATE])
+        np.testing.assert_allclose(rate, [1.0, 1 + 200 * analyzer.NORMAL_TAX_RATE / 300])
+
+        # Merchant tax rate
+        profit, _ = analyzer.calculate_returns(current_lv_price, previous_lv_price, clean_price, merchant=True)
+        np.testing.assert_allclose(profit, [0.0, 200 * analyzer.MERCHANT_TAX_RATE])
+
+    def test_profit_analyzer(self):
+        test_data = {
+            "category": ["accessory", "accessory", "accessory", "accessory", "accessory", "buff"],
+            "name": ["item1", "item1", "item1", "item2", "item2", "item3"],
+            "id": [1, 1, 1, 2, 2, 3],
+            "sid": [2, 0, 1, 0, 1, 0],
+            "lastsoldprice": [500, 100, 200, 50, 300, 10],
+            "currentstock": [3, 20, 7, 9, 1, 5],
+        }
+        df = pd.DataFrame(test_data)
+
+        # Normal case
+        result = analyzer.profit_analyzer(df)
+        self.assertEqual(len(result), 5)
+        self.assertNotIn("item3", result["name"].tolist())
+        self.assertTrue(result["rate"].is_monotonic_decreasing)
+        for _, row in result.iterrows():
+            with self.subTest(msg=f"Testing stats for: {row['name']} {row['enhance']}"):
+                item_df = df[df["name"] == row["name"]]
+                stats = analyzer.calculate_stats(item_df, row["enhance"])
+                self.assertAlmostEqual(row["profit"], stats["profit"])
+                self.assertAlmostEqual(row["rate"], stats["rate"])
+
+        # Missing previous enhancement level
+        with self.assertRaises(analyzer.AnalyzerError):
+            analyzer.profit_analyzer(df[~((df["id"] == 1) & (df["sid"] == 1))])
+
 
 if __name__ == "__main__":
     unittest.main(verbosity=2)
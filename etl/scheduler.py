@@ -1,14 +1,16 @@
 import logging
 import signal
+import time
+from concurrent.futures import ThreadPoolExecutor
 from logging.config import dictConfig
 
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
 from dotenv import load_dotenv
 
-from common import etl_settings
+from common import database, etl_settings
 from etl.analyzer.analyzer import analyzer
-from etl.scraper.scraper import scraper
+from etl.scraper.scraper import DatabaseError, init_schema, scraper, update_item_list
 
 load_dotenv()
 
@@ -17,27 +19,82 @@ load_dotenv()
 dictConfig(etl_settings.ETL_LOGGING_CONFIG)
 logger = logging.getLogger(__name__)
 
+# Attempts to create the scrape tables at startup, waiting for the database to come up
+INIT_SCHEMA_ATTEMPTS = 5
+# Seconds before the first retry, doubled after each failed attempt
+INIT_SCHEMA_BACKOFF = 2
+
+# Endpoints scraped concurrently, each store holds one pooled database connection
+SCRAPER_WORKERS = max(1, min(len(etl_settings.ENDPOINTS), etl_settings.DB_POOL_MAX))
+
+# Reports analyzed concurrently, each run holds one pooled database connection
+ANALYZER_WORKERS = max(1, min(4, etl_settings.DB_POOL_MAX))
+
+
+def init_schema_with_retry():
+    """Create the scrape tables, retrying with backoff while the database is unreachable."""
+    delay = INIT_SCHEMA_BACKOFF
+    for attempt in range(1, INIT_SCHEMA_ATTEMPTS + 1):
+        try:
+            init_schema()
+            return
+        except DatabaseError as e:
+            if attempt == INIT_SCHEMA_ATTEMPTS:
+                # Stores create missing tables themselves, keep the scheduler running
+                logger.error(f"Schema initialization failed after {attempt} attempts: {e}")
+                return
+            logger.warning(f"Schema initialization attempt {attempt} failed, retrying in {delay}s: {e}")
+            time.sleep(delay)
+            delay *= 2
+
+
+def run_scrapers(endpoint_keys, item_name):
+    """Run the scraper for each endpoint in parallel, they write to separate tables."""
+
+    def scrape_endpoint(endpoint_key):
+        logger.info(f"Running scraper for '{endpoint_key}'")
+        # Contain failures so one endpoint does not stop the others
+        try:
+            scraper(endpoint_key, item_name=item_name)
+        except Exception as e:
+            logger.error(f"Scraper error for '{endpoint_key}': {e}", exc_info=True)
+
+    with ThreadPoolExecutor(max_workers=SCRAPER_WORKERS) as executor:
+        list(executor.map(scrape_endpoint, endpoint_keys))
+
+
+def run_analyzers(report_types):
+    """Run the analyzer for each report type in parallel, they only wait on the database."""
+
+    def analyze_report(report_type):
+        logger.info(f"Running analyzer for '{report_type}'")
+        analyzer(report_type)
+
+    with ThreadPoolExecutor(max_workers=ANALYZER_WORKERS) as executor:
+        list(executor.map(analyze_report, report_types))
+
 
 def run_etl():
     try:
         # Run scraper for different endpoints
         endpoint_keys = etl_settings.ENDPOINTS.keys()
         item_name = "all"
-        for endpoint_key in endpoint_keys:
-            logger.info(f"Running scraper for '{endpoint_key}'")
-            scraper(endpoint_key, item_name=item_name)
+        run_scrapers(endpoint_keys, item_name)
 
         # Run analyzer for different reports
         report_types = etl_settings.REPORT_TABLES.keys()
-        for report_type in report_types:
-            logger.info(f"Running analyzer for '{report_type}'")
-            analyzer(report_type)
+        run_analyzers(report_types)
 
     except Exception as e:
         logger.error(f"ETL pipeline error: {e}", exc_info=True)
 
 
 def main():
+    # Clean up the item list once, scrapes then only read it
+    update_item_list()
+    # Create the scrape tables once, stores then only insert
+    init_schema_with_retry()
+
     scheduler = BackgroundScheduler()
 
     job_id = "data_pipeline"
@@ -56,6 +113,7 @@ def main():
         # For graceful shutdown
         def signal_handler(signum, frame):
             scheduler.shutdown()
+            database.close_pool()
             logger.info("Scheduler shutdown")
             exit(0)
 
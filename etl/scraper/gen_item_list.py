@@ -1,14 +1,39 @@
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
 from pathlib import Path
-from typing import Dict
+from typing import Dict, List
 
+import orjson
 import pandas as pd
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
-import common.base_settings as base_settings
+import common.etl_settings as etl_settings
 
 logger = logging.getLogger(__name__)
 
+# Output files are written next to this script
+SCRIPT_DIR = Path(__file__).resolve().parent
+
+# Item keys not kept in the item list
+DROP_KEYS = frozenset({"currentStock", "totalTrades", "basePrice"})
+
+# Categories fetched concurrently, bounded to stay polite to the API
+CATEGORY_WORKERS = 8
+
+# Shared HTTP session, keep-alive connections are reused across categories
+SESSION = requests.Session()
+SESSION.mount(
+    "https://",
+    HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=CATEGORY_WORKERS,
+        max_retries=Retry(total=3, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504)),
+    ),
+)
+
 
 class ScraperError(Exception):
     pass
@@ -24,24 +49,23 @@ class ValidationError(ScraperError):
 
 def construct_url(endpoint: str) -> str:
     """Construct API URL based on endpoint"""
-    url = f"{base_settings.BASE_URL}/{base_settings.REGION}/{endpoint}"
+    url = f"{etl_settings.BASE_URL}/{etl_settings.REGION}/{endpoint}"
     logging.debug(f"{url=}")
     return url
 
 
-def fetch_data(url: str, payload: Dict) -> pd.DataFrame:
+def fetch_data(url: str, payload: Dict) -> List[Dict]:
     try:
         logging.info("Fetching data from API")
-        response = requests.get(url, params=payload, timeout=10)
+        response = SESSION.get(url, params=payload, timeout=10)
         response.raise_for_status()
-        data = response.json()
+        data = orjson.loads(response.content)
 
         if not data:
             raise APIError("Empty response from API")
 
-        df = pd.DataFrame(data)
-        logging.debug(f"{df.shape=}")
-        return df
+        logging.debug(f"{len(data)=}")
+        return data
 
     except requests.RequestException as e:
         raise requests.RequestException(f"Error fetching data: {str(e)}")
@@ -49,14 +73,13 @@ def fetch_data(url: str, payload: Dict) -> pd.DataFrame:
         raise ValueError(f"Error parsing JSON data: {str(e)}")
 
 
-def clean_data(df: pd.DataFrame) -> pd.DataFrame:
+def clean_data(data: List[Dict]) -> List[Dict]:
     try:
         logging.info("Cleaning data")
-        # Drop the unnecessary columns
-        df = df.drop(columns=["currentStock", "totalTrades", "basePrice"], axis=1)
-        df = df.reset_index(drop=True)
-        logging.debug(f"{df.head()=}")
-        return df
+        # Drop the unnecessary keys
+        data = [{key: value for key, value in item.items() if key not in DROP_KEYS} for item in data]
+        logging.debug(f"{data[:5]=}")
+        return data
 
     except Exception as e:
         raise ScraperError(f"Error cleaning data: {str(e)}")
@@ -68,7 +91,9 @@ def store_data(df: pd.DataFrame, file_name: str) -> None:
         df = df.drop_duplicates(subset=["id"])
 
         logging.debug(f"{df.shape=}")
-        df.to_json(file_name, orient="records", indent=4)
+        Path(file_name).write_bytes(
+            orjson.dumps(df.to_dict(orient="records"), option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY)
+        )
         logging.info(f"Data stored in {file_name}")
 
     except Exception as e:
@@ -76,8 +101,7 @@ def store_data(df: pd.DataFrame, file_name: str) -> None:
 
 
 def scraper(file_name: str) -> None:
-    script_dir = Path(__file__).parent
-    output_file = script_dir / file_name
+    output_file = SCRIPT_DIR / file_name
     try:
         endpoint = "GetWorldMarketList"
         url = construct_url(endpoint)
@@ -86,14 +110,17 @@ def scraper(file_name: str) -> None:
         mainCategories = [i for i in range(0, 86, 5)]
         mainCategories[0] = 1
 
-        item_df_list = []
-        for cat in mainCategories:
+        def scrape_category(cat: int) -> List[Dict]:
             payload = {"mainCategory": cat}
-            raw_df = fetch_data(url, payload)
-            cleaned_df = clean_data(raw_df)
-            item_df_list.append(cleaned_df)
+            raw_data = fetch_data(url, payload)
+            return clean_data(raw_data)
+
+        # Requests only wait on the network, fetch categories in parallel keeping their order
+        with ThreadPoolExecutor(max_workers=CATEGORY_WORKERS) as executor:
+            category_items = list(executor.map(scrape_category, mainCategories))
 
-        item_list = pd.concat(item_df_list, ignore_index=True)
+        # Build a single DataFrame from all categories
+        item_list = pd.DataFrame(list(chain.from_iterable(category_items)))
 
         store_data(item_list, output_file)
 
@@ -1,18 +1,79 @@
 import json
 import logging
 from datetime import datetime as dt
+from functools import lru_cache
+from itertools import chain
+from operator import itemgetter
 from pathlib import Path
 from typing import Dict, List, Optional, Union
 
+import numpy as np
+import orjson
+import pandas as pd
 import psycopg2
+import psycopg2.errors
 import requests
+from dateutil.tz import tzlocal
 from psycopg2 import sql
-from psycopg2.extras import execute_batch
+from psycopg2.extensions import cursor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
-from common import etl_settings
+from common import database, etl_settings
 
 logger = logging.getLogger("scraper")
 
+# Item list JSON file, assuming the JSON file is in the same directory
+ITEM_LIST_PATH = Path(__file__).resolve().parent / "item_list.json"
+
+# Game shop item categories, in the order an item id is matched
+ITEM_CATEGORIES = ("buff", "costume", "accessory")
+
+# Valid mainCategory values, 1 to 85 in steps of 5
+MAIN_CATEGORIES = frozenset({1, *range(5, 86, 5)})
+
+# Valid sid (enhancement level) values, 0 to 20
+ENHANCE_LEVELS = frozenset(range(21))
+
+# Shared HTTP session, keep-alive connections are reused across scrapes
+# and transient failures are retried with backoff, honouring Retry-After on 429
+SESSION = requests.Session()
+SESSION.mount(
+    "https://",
+    HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=8,
+        max_retries=Retry(
+            total=3,
+            backoff_factor=0.5,
+            status_forcelist=(429, 500, 502, 503, 504),
+            respect_retry_after_header=True,
+        ),
+    ),
+)
+
+# Scraped item keys stored in the database, in column order
+RECORD_KEYS = (
+    "scrapeTime",
+    "category",
+    "name",
+    "id",
+    "sid",
+    "minEnhance",
+    "maxEnhance",
+    "basePrice",
+    "currentStock",
+    "totalTrades",
+    "priceMin",
+    "priceMax",
+    "lastSoldPrice",
+    "lastSoldTime",
+)
+# Extract insert values from a scraped item in column order
+RECORD_GETTER = itemgetter(*RECORD_KEYS)
+# Table columns are the unquoted, lower case keys
+RECORD_COLUMNS = tuple(key.lower() for key in RECORD_KEYS)
+
 
 class ScraperError(Exception):
     pass
@@ -30,34 +91,40 @@ class ValidationError(ScraperError):
     pass
 
 
+def get_item_list_mtime() -> int:
+    """Modification time of the item list JSON file, used as the cache key of its parsed forms"""
+    try:
+        return ITEM_LIST_PATH.stat().st_mtime_ns
+    except FileNotFoundError:
+        raise FileNotFoundError(f"File not found: {ITEM_LIST_PATH}")
+
+
 def load_item_list() -> Dict[str, Union[List[int], int]]:
+    """Load item list, parsed again only when the JSON file changes"""
+    return read_item_list(ITEM_LIST_PATH, get_item_list_mtime())
+
+
+def load_category_map() -> Dict[int, str]:
+    """Load item id to category mapping, built again only when the JSON file changes"""
+    return read_category_map(ITEM_LIST_PATH, get_item_list_mtime())
+
+
+@lru_cache(maxsize=1)
+def read_category_map(json_path: Path, mtime: int) -> Dict[int, str]:
+    item_list = read_item_list(json_path, mtime)
+    # Lowest priority category first, an id listed in several categories keeps the first match
+    return {item_id: category for category in reversed(ITEM_CATEGORIES) for item_id in item_list.get(category, [])}
+
+
+@lru_cache(maxsize=1)
+def read_item_list(json_path: Path, mtime: int) -> Dict[str, Union[List[int], int]]:
     logger.info("Loading item list")
     try:
-        # Locate the JSON file, assuming the JSON file is in the same directory
-        current_dir = Path(__file__).resolve().parent
-        json_path = current_dir / "item_list.json"
-        with open(json_path, "r") as file:
-            item_list = json.load(file)
-
-        # Deduplicate item id for each category
-        changes_made = False
-        for category, ids in item_list.items():
-            if isinstance(ids, list):
-                # Deduplicates by converting to set and back to list
-                deduplicated_ids = sorted(list(set(ids)))
-                # If any duplicates be removed
-                if len(deduplicated_ids) != len(ids):
-                    logger.info(f"Deduplicated '{len(ids) - len(deduplicated_ids)}' item ids")
-                    changes_made = True
-                item_list[category] = deduplicated_ids
-            else:
-                item_list[category] = ids
-
-        # Update the JSON file if duplicates removed
-        if changes_made:
-            with open(json_path, "w") as file:
-                json.dump(item_list, file, indent=4)
-            logger.info("Successfully deduplicate and update item list")
+        with open(json_path, "rb") as file:
+            item_list = orjson.loads(file.read())
+
+        # Duplicates are removed from the file at startup, drop any added since in memory only
+        deduplicate_item_list(item_list)
 
         if not item_list:
             raise ValueError("Item list is empty")
@@ -67,47 +134,73 @@ def load_item_list() -> Dict[str, Union[List[int], int]]:
         raise FileNotFoundError(f"File not found: {json_path}")
 
 
-def get_item_id(item_name: str = "all") -> List[int]:
-    """Get item id from item list"""
+def deduplicate_item_list(item_list: Dict[str, Union[List[int], int]]) -> int:
+    """Deduplicate item ids of each category in place, returns the number of removed ids"""
+    removed = 0
+    for category, ids in item_list.items():
+        if isinstance(ids, list):
+            unique_ids = set(ids)
+            # Categories without duplicates are left as they are, only changed ones are sorted
+            if len(unique_ids) != len(ids):
+                removed += len(ids) - len(unique_ids)
+                item_list[category] = sorted(unique_ids)
+    return removed
+
+
+def update_item_list() -> None:
+    """Remove duplicate item ids from the item list JSON file, run once at startup"""
+    logger.info("Updating item list")
+    try:
+        with open(ITEM_LIST_PATH, "rb") as file:
+            item_list = orjson.loads(file.read())
+    except FileNotFoundError:
+        raise FileNotFoundError(f"File not found: {ITEM_LIST_PATH}")
+
+    removed = deduplicate_item_list(item_list)
+    # Update the JSON file if duplicates removed
+    if removed:
+        logger.info(f"Deduplicated '{removed}' item ids")
+        # One-off write, keep the tracked file's 4-space layout so the diff only shows removed ids
+        with open(ITEM_LIST_PATH, "w") as file:
+            json.dump(item_list, file, indent=4)
+        logger.info("Successfully deduplicate and update item list")
+
+
+def get_item_id(item_name: str = "all", item_list: Optional[Dict[str, Union[List[int], int]]] = None) -> List[int]:
+    """Get item id from item list, loaded from the JSON file if not given"""
     logger.info(f"Getting item id for '{item_name}'")
-    item_list = load_item_list()
+    if item_list is None:
+        item_list = load_item_list()
     # Item id mapping
     item_id = item_list.get(item_name, None)
     if item_id is None:
         raise ValueError(f"Invalid item name: {item_name}")
-    logger.debug(f"{item_id=}")
+    logger.debug("item_id=%r", item_id)
     return item_id
 
 
-def get_item_category(item_list: list, item_id: int) -> str:
+def get_item_category(item_id: int) -> str:
     """Determine category of an item based on classification"""
-    # Check if item id is in any game shop item categories
-    if item_id in item_list["buff"]:
-        return "buff"
-    elif item_id in item_list["costume"]:
-        return "costume"
-    elif item_id in item_list["accessory"]:
-        return "accessory"
-    return "unknown"
+    return load_category_map().get(item_id, "unknown")
 
 
 def get_endpoint(endpoint_key: str) -> str:
     """Endpoint mapping"""
-    logger.info(f"Getting endpoint for '{endpoint_key}'")
+    logger.debug("Getting endpoint for '%s'", endpoint_key)
     endpoint = etl_settings.ENDPOINTS.get(endpoint_key, None)
     if endpoint is None:
         raise ValueError(f"Invalid endpoint key: {endpoint_key}")
-    logger.debug(f"{endpoint=}")
+    logger.debug("endpoint=%r", endpoint)
     return endpoint
 
 
 def get_table_name(endpoint_key: str) -> str:
     """Table name mapping"""
-    logger.info(f"Getting table name for '{endpoint_key}'")
+    logger.debug("Getting table name for '%s'", endpoint_key)
     table_name = etl_settings.SCRAPE_TABLES.get(endpoint_key, None)
     if table_name is None:
         raise ValueError(f"Invalid endpoint key: {endpoint_key}")
-    logger.debug(f"{table_name=}")
+    logger.debug("table_name=%r", table_name)
     return table_name
 
 
@@ -118,33 +211,26 @@ def get_payload(endpoint: str, **kwargs) -> Dict:
     if endpoint == "list":
         if kwargs.get("mainCategory") is None:
             raise ValueError(f"mainCategory is required for '{endpoint}'")
-        # mainCategory is in range from 1 to 85
-        mainCategoryRange = list(range(0, 86, 5))
-        mainCategoryRange[0] = 1
-        if kwargs.get("mainCategory") not in mainCategoryRange:
+        if kwargs["mainCategory"] not in MAIN_CATEGORIES:
             raise ValueError("mainCategory should be in range from 1 to 85 step 5")
 
     if endpoint != "list" and kwargs.get("sid") is not None:
-        # sid is in range from 0 to 20
-        if kwargs.get("sid") not in range(0, 21):
+        if kwargs["sid"] not in ENHANCE_LEVELS:
             raise ValueError("sid should be in range from 0 to 20")
 
-    payload = {}
-    for key, value in kwargs.items():
-        if value is not None:
-            payload[key] = value
-    logger.debug(f"{payload=}")
+    payload = {key: value for key, value in kwargs.items() if value is not None}
+    logger.debug("payload=%r", payload)
     return payload
 
 
 def construct_url(endpoint: str) -> str:
     """Construct API URL based on endpoint"""
     url = f"{etl_settings.BASE_URL}/{etl_settings.REGION}/{endpoint}"
-    logger.debug(f"{url=}")
+    logger.debug("url=%r", url)
     return url
 
 
-def fetch_data(url: str, payload: Dict) -> Optional[List[Dict]]:
+def fetch_data(url: str, payload: Dict, category_map: Optional[Dict[int, str]] = None) -> Optional[List[Dict]]:
     """
     Fetch data from the API endpoint.
 
@@ -154,6 +240,8 @@ def fetch_data(url: str, payload: Dict) -> Optional[List[Dict]]:
         API endpoint URL
     payload : dict
         Query parameters for the API request
+    category_map : dict, optional
+        Item id to category mapping, loaded from the item list if not given
 
     Returns
     -------
@@ -171,26 +259,39 @@ def fetch_data(url: str, payload: Dict) -> Optional[List[Dict]]:
     scrape_time = current_time.replace(minute=0, second=0, microsecond=0)
 
     try:
-        response = requests.get(url, params=payload, timeout=10)
+        response = SESSION.get(url, params=payload, timeout=10)
         response.raise_for_status()
 
-        data = response.json()
+        data = orjson.loads(response.content)
         if not data:
             raise APIError("Empty response from API")
 
-        flattened_data = []
-        for sublist in data:
-            for item in sublist:
-                flattened_data.append(item)
-
-        # Add timestamp, category, and convert lastSoldTime to datetime
-        item_list = load_item_list()
-        for i in range(len(flattened_data)):
-            flattened_data[i]["scrapeTime"] = scrape_time
-            flattened_data[i]["category"] = get_item_category(item_list, flattened_data[i]["id"])
-            flattened_data[i]["lastSoldTime"] = dt.fromtimestamp(flattened_data[i]["lastSoldTime"])
-
-        logger.debug(f"{len(flattened_data)=}")
+        # Items are already dicts, flatten without copying them
+        flattened_data = list(chain.from_iterable(data))
+
+        # Convert lastSoldTime to local datetime in one batch
+        last_sold_times = (
+            pd.to_datetime(
+                np.fromiter(
+                    (item["lastSoldTime"] for item in flattened_data), dtype=np.int64, count=len(flattened_data)
+                ),
+                unit="s",
+                utc=True,
+            )
+            .tz_convert(tzlocal())
+            .tz_localize(None)
+            .to_pydatetime()
+        )
+
+        # Add timestamp, category, and converted lastSoldTime
+        if category_map is None:
+            category_map = load_category_map()
+        for item, last_sold_time in zip(flattened_data, last_sold_times):
+            item["scrapeTime"] = scrape_time
+            item["category"] = category_map.get(item["id"], "unknown")
+            item["lastSoldTime"] = last_sold_time
+
+        logger.debug("len(flattened_data)=%r", len(flattened_data))
         return flattened_data
 
     except requests.exceptions.HTTPError as httpe:
@@ -204,6 +305,73 @@ def fetch_data(url: str, payload: Dict) -> Optional[List[Dict]]:
         raise APIError(f"Failed to parse API response: {ve}")
 
 
+def create_table(cur: cursor, table_name: str) -> None:
+    """
+    Create a scrape table and its indexes for the analyzer queries if they do not exist.
+
+    Parameters
+    ----------
+    cur : psycopg2.extensions.cursor
+        Database cursor
+    table_name : str
+        Name of the table to create
+    """
+    create_table_query = sql.SQL(
+        """
+        CREATE TABLE IF NOT EXISTS {table_name} (
+            scrapeID SERIAL PRIMARY KEY,
+            scrapeTime TIMESTAMP,
+            category VARCHAR(16),
+            name VARCHAR(255),
+            id INT,
+            sid INT,
+            minEnhance INT,
+            maxEnhance INT,
+            basePrice BIGINT,
+            currentStock BIGINT,
+            totalTrades BIGINT,
+            priceMin BIGINT,
+            priceMax BIGINT,
+            lastSoldPrice BIGINT,
+            lastSoldTime TIMESTAMP,
+            UNIQUE (scrapeTime, id, sid)
+        );
+        CREATE INDEX IF NOT EXISTS {category_index_name} ON {table_name} (category, scrapeTime)
+            INCLUDE (name, id, sid, currentStock, lastSoldPrice, totalTrades);
+        CREATE INDEX IF NOT EXISTS {item_index_name} ON {table_name} (id, sid, scrapeTime);
+        """
+    ).format(
+        table_name=sql.Identifier(table_name),
+        category_index_name=sql.Identifier(f"{table_name}_category_scrapetime_idx"),
+        item_index_name=sql.Identifier(f"{table_name}_id_sid_scrapetime_idx"),
+    )
+    cur.execute(create_table_query)
+    logger.debug("Initialized '%s'", table_name)
+
+
+def init_schema() -> None:
+    """
+    Create the scrape tables and their indexes if they do not exist.
+
+    Run once at startup so that storing a scrape only has to insert.
+
+    Raises
+    ------
+    DatabaseError
+        If database operation fails
+    """
+    logger.info("Initializing scrape tables")
+    try:
+        with database.get_connection() as conn:
+            with conn.cursor() as cur:
+                for table_name in etl_settings.SCRAPE_TABLES.values():
+                    create_table(cur, table_name)
+
+    except psycopg2.Error as dbe:
+        logger.error(f"Database schema error: {dbe}")
+        raise DatabaseError(f"Database schema error: {dbe}")
+
+
 def store_data(data: Dict, table_name: str) -> None:
     """
     Store scraped data in the database.
@@ -232,74 +400,19 @@ def store_data(data: Dict, table_name: str) -> None:
         raise ValidationError("No table name to store")
 
     try:
-        with psycopg2.connect(**etl_settings.DATABASE_CONFIG) as conn:
+        with database.get_connection() as conn:
             logger.debug("Database connection established")
             with conn.cursor() as cur:
                 try:
-                    # Create table if not exists
-                    create_table_query = sql.SQL(
-                        """
-                        CREATE TABLE IF NOT EXISTS {table_name} (
-                            scrapeID SERIAL PRIMARY KEY,
-                            scrapeTime TIMESTAMP,
-                            category VARCHAR(16),
-                            name VARCHAR(255),
-                            id INT,
-                            sid INT,
-                            minEnhance INT,
-                            maxEnhance INT,
-                            basePrice BIGINT,
-                            currentStock BIGINT,
-                            totalTrades BIGINT,
-                            priceMin BIGINT,
-                            priceMax BIGINT,
-                            lastSoldPrice BIGINT,
-                            lastSoldTime TIMESTAMP,
-                            UNIQUE (scrapeTime, id, sid)
-                        )
-                        """
-                    ).format(table_name=sql.Identifier(table_name))
-                    cur.execute(create_table_query)
-
-                    # Batch insert
-                    # Prepare for batch insert
-                    insert_query = sql.SQL(
-                        """
-                        INSERT INTO {table_name} (
-                            scrapeTime, category, name, id, sid, minEnhance, 
-                            maxEnhance, basePrice, currentStock, 
-                            totalTrades, priceMin, priceMax, 
-                            lastSoldPrice, lastSoldTime
-                        ) VALUES (
-                            %s, %s, %s, %s, %s, %s, %s, %s, %s, 
-                            %s, %s, %s, %s, %s
-                        )
-                        """
-                    ).format(table_name=sql.Identifier(table_name))
-
-                    # Prepare records for batch insert
-                    records = []
-                    for item in data:
-                        records.append(
-                            (
-                                item["scrapeTime"],
-                                item["category"],
-                                item["name"],
-                                item["id"],
-                                item["sid"],
-                                item["minEnhance"],
-                                item["maxEnhance"],
-                                item["basePrice"],
-                                item["currentStock"],
-                                item["totalTrades"],
-                                item["priceMin"],
-                                item["priceMax"],
-                                item["lastSoldPrice"],
-                                item["lastSoldTime"],
-                            )
-                        )
-
-                    execute_batch(cur, insert_query, records)
+                    # Bulk load with COPY, records are streamed as CSV in column order
+                    try:
+                        database.copy_records(cur, table_name, RECORD_COLUMNS, map(RECORD_GETTER, data))
+                    except psycopg2.errors.UndefinedTable:
+                        # Schema not initialized, e.g. scraper run outside the scheduler
+                        logger.info(f"Table '{table_name}' not found, creating it")
+                        conn.rollback()
+                        create_table(cur, table_name)
+                        database.copy_records(cur, table_name, RECORD_COLUMNS, map(RECORD_GETTER, data))
                     conn.commit()
                     logger.info(f"Successfully stored '{len(data)}' records in '{table_name}'")
 
@@ -315,14 +428,17 @@ def store_data(data: Dict, table_name: str) -> None:
 
 
 def scraper(endpoint_key: str, **kwargs) -> None:
-    logger.debug(f"scraper({endpoint_key=}, {kwargs=})")
+    logger.debug("scraper(endpoint_key=%r, kwargs=%r)", endpoint_key, kwargs)
     try:
         endpoint = get_endpoint(endpoint_key)
+        # Resolve the item list once and share it with the lookups below
+        item_list = load_item_list()
+        category_map = load_category_map()
         # Ensure the kwargs contain item name
-        item_id = get_item_id(kwargs["item_name"])
+        item_id = get_item_id(kwargs["item_name"], item_list)
         payload = get_payload(endpoint, id=item_id)
         url = construct_url(endpoint)
-        data = fetch_data(url, payload)
+        data = fetch_data(url, payload, category_map)
         table_name = get_table_name(endpoint_key)
         store_data(data, table_name)
 
@@ -1,6 +1,8 @@
 import sys
+from datetime import datetime as dt
 from pathlib import Path
 
+import orjson
 import requests
 
 # Add the parent directory to the Python path
@@ -186,11 +188,11 @@ class TestScraper(unittest.TestCase):
                     with self.assertRaises(expected):
                         scraper.get_payload(endpoint, **kwargs)
 
-    @patch("scraper.requests.get")
+    @patch("scraper.SESSION.get")
     def test_fetch_data(self, mock_get):
         # Mock successful response object
         mock_response = MagicMock()
-        mock_response.json.return_value = self.valid_response_data
+        mock_response.content = orjson.dumps(self.valid_response_data)
         mock_get.return_value = mock_response
 
         # Successful case
@@ -201,7 +203,10 @@ class TestScraper(unittest.TestCase):
         # Simulate the process in fetch_data()
         for sublist in self.valid_response_data:
             for item in sublist:
+                item = dict(item)
                 item["scrapeTime"] = result[0]["scrapeTime"]  # Use the actual scrape time
+                item["category"] = scraper.get_item_category(item["id"])
+                item["lastSoldTime"] = dt.fromtimestamp(item["lastSoldTime"])
                 expected_data.append(item)
 
         self.assertEqual(result, expected_data)